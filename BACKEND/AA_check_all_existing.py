@@ -1,16 +1,44 @@
 #!/usr/bin/env python3
 
 import asyncio
-import json
+import os
+import random
+import re
 import statistics
 import sys
 import time
+from collections import defaultdict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
-from urllib.parse import urljoin
+from typing import Any, Callable
+from urllib.parse import urljoin, urlsplit, urlunsplit
 
 import aiohttp
 
+try:
+    # uvloop is a drop-in, faster event loop; it is not available on Windows.
+    import uvloop
+
+    # uvloop.run only exists from uvloop 0.18 on.
+    _run = getattr(uvloop, "run", asyncio.run)
+except ImportError:
+    _run = asyncio.run
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(data: Any) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    import json
+
+    _loads = json.loads
+
+    def _dumps(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 BLACKLIST_PATH = PROJECT_ROOT / "DATA" / "CHECK" / "BLACKLIST.json"
 if str(PROJECT_ROOT) not in sys.path:
@@ -19,10 +47,14 @@ if str(PROJECT_ROOT) not in sys.path:
 import SETTINGS as settings
 
 DEFAULT_MAX_WORKERS = 30
+DEFAULT_PER_HOST_LIMIT = 8
 DEFAULT_TIMEOUT_RETRIES = 2
 DEFAULT_SEGMENT_SAMPLE_COUNT = 3
 DEFAULT_MIN_SUCCESSFUL_SEGMENTS = 2
 DEFAULT_MAX_SEGMENT_DURATION = 10.0
+DEFAULT_SEGMENT_PROBE_BYTES = 262144
+# Anchored so AVERAGE-BANDWIDTH= is not picked up instead of BANDWIDTH=.
+_BANDWIDTH_RE = re.compile(r"(?:^|,)BANDWIDTH=(\d+)")
 
 
 class SourceJob:
@@ -31,38 +63,22 @@ class SourceJob:
         self.output_path = output_path
 
 
+@dataclass(slots=True)
 class StreamCheckResult:
-    def __init__(
-        self,
-        url: str,
-        ok: bool,
-        reason: str,
-        elapsed: float,
-        score: float = 0.0,
-        throughput_ratio: float = 0.0,
-        avg_segment_mbps: float = 0.0,
-        required_mbps: float = 0.0,
-        segments_ok: int = 0,
-        segments_total: int = 0,
-        jitter_ratio: float = 0.0,
-        stall_count: int = 0,
-        rebuffer_seconds: float = 0.0,
-        avg_download_ratio: float = 0.0,
-    ) -> None:
-        self.url = url
-        self.ok = ok
-        self.reason = reason
-        self.elapsed = elapsed
-        self.score = score
-        self.throughput_ratio = throughput_ratio
-        self.avg_segment_mbps = avg_segment_mbps
-        self.required_mbps = required_mbps
-        self.segments_ok = segments_ok
-        self.segments_total = segments_total
-        self.jitter_ratio = jitter_ratio
-        self.stall_count = stall_count
-        self.rebuffer_seconds = rebuffer_seconds
-        self.avg_download_ratio = avg_download_ratio
+    url: str
+    ok: bool
+    reason: str
+    elapsed: float
+    score: float = 0.0
+    throughput_ratio: float = 0.0
+    avg_segment_mbps: float = 0.0
+    required_mbps: float = 0.0
+    segments_ok: int = 0
+    segments_total: int = 0
+    jitter_ratio: float = 0.0
+    stall_count: int = 0
+    rebuffer_seconds: float = 0.0
+    avg_download_ratio: float = 0.0
 
 
 def _positive_int_setting(name: str, default: int) -> int:
@@ -83,6 +99,10 @@ def get_max_workers() -> int:
     return _positive_int_setting("CHECK_M3U8_MAX_WORKERS", DEFAULT_MAX_WORKERS)
 
 
+def get_per_host_limit() -> int:
+    return _positive_int_setting("CHECK_M3U8_PER_HOST_LIMIT", DEFAULT_PER_HOST_LIMIT)
+
+
 def get_timeout_retries() -> int:
     return _positive_int_setting("CHECK_M3U8_TIMEOUT_RETRIES", DEFAULT_TIMEOUT_RETRIES)
 
@@ -101,6 +121,19 @@ def get_max_segment_duration() -> float:
     return _positive_float_setting("CHECK_M3U8_MAX_SEGMENT_DURATION", DEFAULT_MAX_SEGMENT_DURATION)
 
 
+def get_segment_probe_bytes() -> int:
+    return _positive_int_setting("CHECK_M3U8_SEGMENT_PROBE_BYTES", DEFAULT_SEGMENT_PROBE_BYTES)
+
+
+def _build_resolver() -> aiohttp.AsyncResolver | None:
+    # aiodns resolves many hosts concurrently inside the loop. Without it aiohttp
+    # falls back to its default thread-pool resolver.
+    try:
+        return aiohttp.AsyncResolver()
+    except RuntimeError:
+        return None
+
+
 def _path_from_setting(value: Any) -> Path:
     return Path(value).expanduser().resolve()
 
@@ -140,109 +173,158 @@ def get_source_jobs() -> list[SourceJob]:
 
 
 def load_urls_from_json(path: Path) -> list[str]:
-    with open(path, encoding="utf-8") as f:
-        data = json.load(f)
+    data = _loads(Path(path).read_bytes())
     if not isinstance(data, list):
         raise ValueError(f"Expected JSON array in {path}")
-    seen: set[str] = set()
-    urls: list[str] = []
-    for item in data:
-        if not isinstance(item, str):
-            continue
-        url = item.strip()
-        if not url or url in seen:
-            continue
-        seen.add(url)
-        urls.append(url)
-    return urls
+    stripped = (item.strip() for item in data if isinstance(item, str))
+    return list(dict.fromkeys(url for url in stripped if url))
+
+
+def _write_bytes(path: Path, payload: bytes) -> None:
+    # Raw fd write: no text-mode translation or buffered writer copy for large lists.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
 
 
 def save_urls_to_json(path: Path, urls: list[str]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(urls, f, ensure_ascii=False, indent=2)
+    # Write-then-rename so a crash mid-write never leaves a truncated list behind.
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    _write_bytes(tmp_path, _dumps(urls))
+    os.replace(tmp_path, path)
 
 
 def save_blacklist_with_merge(path: Path, failed_urls: list[str]) -> int:
     existing: list[str] = []
-    if path.exists():
-        with open(path, encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            existing = [item.strip() for item in data if isinstance(item, str) and item.strip()]
-
-    merged: list[str] = []
-    seen: set[str] = set()
-    for url in existing:
-        if url in seen:
-            continue
-        seen.add(url)
-        merged.append(url)
+    try:
+        data = _loads(path.read_bytes())
+    except FileNotFoundError:
+        data = None
+    if isinstance(data, list):
+        existing = list(
+            dict.fromkeys(item.strip() for item in data if isinstance(item, str) and item.strip())
+        )
 
-    added = 0
-    for url in failed_urls:
-        candidate = url.strip()
-        if not candidate or candidate in seen:
-            continue
-        seen.add(candidate)
-        merged.append(candidate)
-        added += 1
+    merged = list(dict.fromkeys(existing + [url.strip() for url in failed_urls if url.strip()]))
+    # Steady state adds nothing; leave the file untouched instead of rewriting identical content.
+    if merged != data:
+        save_urls_to_json(path, merged)
+    return len(merged) - len(existing)
+
+
+def _url_joiner(base_url: str) -> Callable[[str], str]:
+    """Build a urljoin(base_url, ref) equivalent that splits the base only once."""
+    parts = urlsplit(base_url)
+    fast_base: str | None = None
+    if "/." not in parts.path and "//" not in parts.path:
+        directory = parts.path.rsplit("/", 1)[0] + "/"
+        fast_base = urlunsplit((parts.scheme, parts.netloc, directory, "", ""))
+
+    def join(ref: str) -> str:
+        if ref.startswith(("http://", "https://")):
+            return ref
+        # Plain relative names ("seg1.ts?x=1") just hang off the base directory.
+        if (
+            fast_base is not None
+            and ref[0] not in "/?#."
+            and ":" not in ref
+            and "/." not in ref
+            and "//" not in ref
+        ):
+            return fast_base + ref
+        return urljoin(base_url, ref)
+
+    return join
+
+
+def _on_extinf(state: dict[str, float | None], value: str) -> None:
+    try:
+        state["duration"] = float(value.split(",", 1)[0].strip())
+    except ValueError:
+        state["duration"] = None
 
-    save_urls_to_json(path, merged)
-    return added
 
+def _on_stream_inf(state: dict[str, float | None], value: str) -> None:
+    match = _BANDWIDTH_RE.search(value)
+    state["bandwidth"] = float(match.group(1)) if match else 0.0
 
-def _parse_attr_value(attr_line: str, key: str) -> str | None:
-    marker = f"{key}="
-    if marker not in attr_line:
-        return None
-    for part in attr_line.split(","):
-        if part.startswith(marker):
-            return part[len(marker):].strip().strip('"')
-    return None
 
+# Tag handlers keyed by the text before the first ":"; add #EXT-X-MAP, #EXT-X-KEY, ... here.
+_PLAYLIST_TAG_HANDLERS = {
+    "#EXTINF": _on_extinf,
+    "#EXT-X-STREAM-INF": _on_stream_inf,
+}
 
-def _playlist_entries(playlist_text: str) -> list[str]:
-    entries: list[str] = []
-    for line in playlist_text.splitlines():
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-        entries.append(line)
-    return entries
 
+def _parse_playlist(
+    playlist_text: str,
+    base_url: str,
+    sample_count: int = 0,
+    max_segment_duration: float = float("inf"),
+) -> tuple[list[tuple[float, str]], list[tuple[str, float | None]]]:
+    """Scan a playlist once, returning master variants and media segments.
 
-def _segment_entries(playlist_text: str, playlist_url: str) -> list[tuple[str, float | None]]:
+    With sample_count set, a media playlist stops parsing once that many segments
+    short enough to be sampled have been seen; the rest would never be probed.
+    """
+    variants: list[tuple[float, str]] = []
     segments: list[tuple[str, float | None]] = []
-    pending_duration: float | None = None
+    state: dict[str, float | None] = {"duration": None, "bandwidth": None}
+    join = _url_joiner(base_url)
+    eligible = 0
     for raw_line in playlist_text.splitlines():
         line = raw_line.strip()
         if not line:
             continue
-        if line.startswith("#EXTINF:"):
-            value = line.split(":", 1)[1].split(",", 1)[0].strip()
-            try:
-                pending_duration = float(value)
-            except ValueError:
-                pending_duration = None
+        if line[0] == "#":
+            tag, _, value = line.partition(":")
+            handler = _PLAYLIST_TAG_HANDLERS.get(tag)
+            if handler is not None:
+                handler(state, value)
             continue
-        if line.startswith("#"):
+        bandwidth = state["bandwidth"]
+        if bandwidth is not None:
+            variants.append((bandwidth, join(line)))
+            state["bandwidth"] = None
             continue
-        segments.append((urljoin(playlist_url, line), pending_duration))
-        pending_duration = None
-    return segments
+        duration = state["duration"]
+        segments.append((join(line), duration))
+        state["duration"] = None
+        if duration is None or duration <= max_segment_duration:
+            eligible += 1
+            if eligible == sample_count and not variants:
+                break
+    return variants, segments
+
+
+def _attempt_timeout(timeout_seconds: float, retries: int) -> aiohttp.ClientTimeout:
+    # Only the TCP connect gets a share of the budget, so an unreachable host leaves time for
+    # the retries; once connected, each attempt has the full timeout, as in BC and C.
+    return aiohttp.ClientTimeout(
+        total=timeout_seconds, sock_connect=max(timeout_seconds / retries, 1.0)
+    )
+
+
+async def _retry_backoff(attempt: int) -> None:
+    # Exponential backoff with jitter so retries do not hit a congested CDN in lockstep.
+    await asyncio.sleep(min(0.2 * (2 ** (attempt - 1)), 2.0) * (0.5 + random.random()))
 
 
 async def _fetch_text(
     session: aiohttp.ClientSession, url: str, timeout_seconds: float, retries: int
 ) -> tuple[bool, str, float, str | None]:
     started = time.perf_counter()
-    timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+    attempt_timeout = _attempt_timeout(timeout_seconds, retries)
     timeout_count = 0
     last_error: str | None = None
     for attempt in range(1, retries + 1):
         try:
-            async with session.get(url, timeout=timeout) as response:
+            async with session.get(url, timeout=attempt_timeout) as response:
                 elapsed = time.perf_counter() - started
                 if response.status != 200:
                     return False, f"HTTP {response.status} (try {attempt}/{retries})", elapsed, None
@@ -250,6 +332,8 @@ async def _fetch_text(
                 return True, f"GET 200 (try {attempt}/{retries})", elapsed, text
         except asyncio.TimeoutError:
             timeout_count += 1
+            if attempt < retries:
+                await _retry_backoff(attempt)
             continue
         except aiohttp.ClientError as exc:
             last_error = exc.__class__.__name__
@@ -265,19 +349,42 @@ async def _fetch_text(
 
 
 async def _download_segment(
-    session: aiohttp.ClientSession, url: str, timeout_seconds: float, retries: int
+    session: aiohttp.ClientSession,
+    url: str,
+    timeout_seconds: float,
+    retries: int,
+    probe_bytes: int,
 ) -> tuple[bool, str, float, int]:
-    timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+    timeout = _attempt_timeout(timeout_seconds, retries)
     for attempt in range(1, retries + 1):
         started = time.perf_counter()
         try:
             async with session.get(url, timeout=timeout) as response:
                 if response.status != 200:
                     return False, f"segment HTTP {response.status} (try {attempt}/{retries})", 0.0, 0
-                payload = await response.read()
-                elapsed = max(time.perf_counter() - started, 0.001)
-                return True, "segment OK", elapsed, len(payload)
+                headers_at = time.perf_counter()
+                # Stop early only when the real size is known and the transfer can be extrapolated;
+                # chunked or content-encoded segments are read in full.
+                full_size = response.content_length
+                if "Content-Encoding" in response.headers:
+                    full_size = None
+                limit = probe_bytes if full_size else None
+                received = 0
+                async for chunk in response.content.iter_chunked(65536):
+                    received += len(chunk)
+                    if limit is not None and received >= limit:
+                        break
+                transfer = time.perf_counter() - headers_at
+                if full_size and full_size > received > 0:
+                    # Probe stopped early: extrapolate the transfer to the whole segment so
+                    # download ratios and bitrate estimates stay comparable to a full read.
+                    transfer *= full_size / received
+                    received = full_size
+                elapsed = max(headers_at - started + transfer, 0.001)
+                return True, "segment OK", elapsed, received
         except asyncio.TimeoutError:
+            if attempt < retries:
+                await _retry_backoff(attempt)
             continue
         except aiohttp.ClientError as exc:
             return False, f"segment error ({exc.__class__.__name__})", 0.0, 0
@@ -286,6 +393,21 @@ async def _download_segment(
     return False, f"segment timeout ({retries}/{retries})", 0.0, 0
 
 
+def _simulate_playback(timings: list[tuple[float, float]]) -> tuple[int, float]:
+    """Replay (duration, elapsed) pairs through a playback buffer; return stalls and rebuffer time."""
+    stall_count = 0
+    rebuffer_seconds = 0.0
+    buffered_seconds = 0.0
+    for index, (duration, elapsed) in enumerate(timings):
+        # Initial startup buffering should not be treated as rebuffering.
+        wait = elapsed if index else 0.0
+        deficit = max(0.0, wait - buffered_seconds)
+        rebuffer_seconds += deficit
+        stall_count += deficit > 0.0
+        buffered_seconds = max(0.0, buffered_seconds - wait) + duration
+    return stall_count, rebuffer_seconds
+
+
 def _score_stream(
     success_ratio: float,
     throughput_ratio: float,
@@ -318,6 +440,20 @@ def _score_stream(
     )
 
 
+def rank_results(
+    rows: list[StreamCheckResult],
+) -> tuple[list[StreamCheckResult], list[StreamCheckResult]]:
+    """Split results into (valid sorted best-first, failed) in one pass."""
+    valid_rows: list[StreamCheckResult] = []
+    failed_rows: list[StreamCheckResult] = []
+    for row in rows:
+        (valid_rows if row.ok else failed_rows).append(row)
+    valid_rows.sort(
+        key=lambda row: (-row.score, -row.throughput_ratio, row.jitter_ratio, row.elapsed, row.url)
+    )
+    return valid_rows, failed_rows
+
+
 async def check_stream_quality(
     session: aiohttp.ClientSession,
     url: str,
@@ -326,6 +462,7 @@ async def check_stream_quality(
     segment_sample_count: int,
     min_successful_segments: int,
     max_segment_duration: float,
+    segment_probe_bytes: int,
 ) -> StreamCheckResult:
     started = time.perf_counter()
 
@@ -333,37 +470,11 @@ async def check_stream_quality(
     if not ok or not playlist_text:
         return StreamCheckResult(url=url, ok=False, reason=f"playlist: {reason}", elapsed=head_elapsed)
 
-    media_playlist_url = url
-    media_playlist_text = playlist_text
     required_bps = 0.0
-
-    if "#EXT-X-STREAM-INF" in playlist_text:
-        lines = [line.strip() for line in playlist_text.splitlines()]
-        variants: list[tuple[float, str]] = []
-        for idx, line in enumerate(lines):
-            if not line.startswith("#EXT-X-STREAM-INF:"):
-                continue
-            attrs = line.split(":", 1)[1]
-            bandwidth = _parse_attr_value(attrs, "BANDWIDTH")
-            bw = float(bandwidth) if (bandwidth and bandwidth.isdigit()) else 0.0
-            next_uri = ""
-            for j in range(idx + 1, len(lines)):
-                candidate = lines[j]
-                if not candidate:
-                    continue
-                if candidate.startswith("#"):
-                    break
-                next_uri = candidate
-                break
-            if next_uri:
-                variants.append((bw, urljoin(url, next_uri)))
-        if not variants:
-            return StreamCheckResult(
-                url=url,
-                ok=False,
-                reason="master playlist without playable variants",
-                elapsed=time.perf_counter() - started,
-            )
+    variants, segments = _parse_playlist(
+        playlist_text, url, segment_sample_count, max_segment_duration
+    )
+    if variants:
         variants.sort(key=lambda item: item[0], reverse=True)
         required_bps = variants[0][0]
         media_playlist_url = variants[0][1]
@@ -377,11 +488,10 @@ async def check_stream_quality(
                 reason=f"variant playlist: {reason}",
                 elapsed=time.perf_counter() - started,
             )
+        _, segments = _parse_playlist(
+            media_playlist_text, media_playlist_url, segment_sample_count, max_segment_duration
+        )
 
-    segments = _segment_entries(media_playlist_text, media_playlist_url)
-    if not segments:
-        fallback_entries = _playlist_entries(media_playlist_text)
-        segments = [(urljoin(media_playlist_url, entry), None) for entry in fallback_entries]
     if not segments:
         return StreamCheckResult(
             url=url,
@@ -404,14 +514,11 @@ async def check_stream_quality(
     segment_durations: list[float] = []
     segment_bits: list[float] = []
     download_ratios: list[float] = []
-    stall_count = 0
-    rebuffer_seconds = 0.0
-    buffered_seconds = 0.0
-    playback_started = False
+    playback_timings: list[tuple[float, float]] = []
     errors: list[str] = []
     for seg_url, seg_duration in sampled:
         seg_ok, seg_reason, seg_elapsed, seg_bytes = await _download_segment(
-            session, seg_url, timeout_seconds, retries
+            session, seg_url, timeout_seconds, retries, segment_probe_bytes
         )
         if not seg_ok or seg_bytes <= 0:
             errors.append(seg_reason)
@@ -422,17 +529,8 @@ async def check_stream_quality(
         if seg_duration is not None and seg_duration > 0:
             segment_durations.append(seg_duration)
             download_ratios.append(seg_elapsed / seg_duration)
-            if not playback_started:
-                # Initial startup buffering should not be treated as rebuffering.
-                buffered_seconds += seg_duration
-                playback_started = True
-                continue
-            buffered_seconds -= seg_elapsed
-            if buffered_seconds < 0:
-                rebuffer_seconds += -buffered_seconds
-                stall_count += 1
-                buffered_seconds = 0.0
-            buffered_seconds += seg_duration
+            playback_timings.append((seg_duration, seg_elapsed))
+    stall_count, rebuffer_seconds = _simulate_playback(playback_timings)
 
     segments_total = len(sampled)
     segments_ok = len(segment_rates_bps)
@@ -519,24 +617,25 @@ async def check_stream_quality(
 
 
 async def run_checks(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    host_slots: defaultdict[str, asyncio.Semaphore],
+    label: str,
     urls: list[str],
     timeout_seconds: float,
-    max_workers: int,
     retries: int,
     segment_sample_count: int,
     min_successful_segments: int,
     max_segment_duration: float,
+    segment_probe_bytes: int,
 ) -> list[StreamCheckResult]:
-    headers = {
-        "User-Agent": getattr(settings, "DEFAULT_USER_AGENT", "Mozilla/5.0"),
-        "Accept": getattr(settings, "DEFAULT_ACCEPT_HEADER", "*/*"),
-    }
-    connector = aiohttp.TCPConnector(limit=max_workers, limit_per_host=max_workers)
     results: list[StreamCheckResult | None] = [None] * len(urls)
     done = 0
 
-    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
-        async def run_one(index: int, url: str) -> tuple[int, StreamCheckResult]:
+    async def run_one(index: int, url: str) -> tuple[int, StreamCheckResult]:
+        # Wait for the host's slot before the global one and before any timer starts, so a
+        # queue on a busy CDN never counts against a check's timeout.
+        async with host_slots[urlsplit(url).hostname or ""], semaphore:
             row = await check_stream_quality(
                 session=session,
                 url=url,
@@ -545,136 +644,165 @@ async def run_checks(
                 segment_sample_count=segment_sample_count,
                 min_successful_segments=min_successful_segments,
                 max_segment_duration=max_segment_duration,
+                segment_probe_bytes=segment_probe_bytes,
             )
-            return index, row
-
-        total = len(urls)
-        for start in range(0, total, max_workers):
-            end = min(start + max_workers, total)
-            batch_no = (start // max_workers) + 1
-            batch_total = (total + max_workers - 1) // max_workers
-            print(f"-- Batch {batch_no}/{batch_total}: items {start + 1}-{end} of {total} --")
-            batch_tasks = [
-                asyncio.create_task(run_one(index, urls[index]))
-                for index in range(start, end)
-            ]
-            try:
-                for completed in asyncio.as_completed(batch_tasks):
-                    index, row = await completed
-                    results[index] = row
-                    done += 1
-                    status = "OK" if row.ok else "FAIL"
-                    print(
-                        f"[{done}/{total}] {status} score={row.score:.1f} "
-                        f"ratio={row.throughput_ratio:.2f} {row.url} ({row.reason}) [{row.elapsed:.2f}s]"
-                    )
-            except asyncio.CancelledError:
-                for task in batch_tasks:
-                    task.cancel()
-                await asyncio.gather(*batch_tasks, return_exceptions=True)
-                raise
-            print(f"-- Batch {batch_no}/{batch_total} complete. Processed so far: {done}/{total} --")
+        return index, row
 
-    return [row for row in results if row is not None]
+    total = len(urls)
+    # A new URL starts as soon as any slot frees, so one slow stream no longer stalls a batch.
+    tasks = [asyncio.create_task(run_one(index, url)) for index, url in enumerate(urls)]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            index, row = await completed
+            results[index] = row
+            done += 1
+            status = "OK" if row.ok else "FAIL"
+            print(
+                f"[{label}] [{done}/{total}] {status} score={row.score:.1f} "
+                f"ratio={row.throughput_ratio:.2f} {row.url} ({row.reason}) [{row.elapsed:.2f}s]"
+            )
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
 
+    return [row for row in results if row is not None]
 
-def main() -> int:
-    total_started_at = time.perf_counter()
 
+async def run_checks_for_job(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    host_slots: defaultdict[str, asyncio.Semaphore],
+    job: SourceJob,
+    timeout_seconds: float,
+    retries: int,
+    segment_sample_count: int,
+    min_successful_segments: int,
+    max_segment_duration: float,
+    segment_probe_bytes: int,
+) -> tuple[int, int, list[str]]:
+    """Check one source file; return (input URL count, working URL count, failed URLs)."""
+    label = job.input_path.name
+    # One open() instead of exists() + open(): a missing file surfaces as FileNotFoundError.
     try:
-        reconfigure_stdout = getattr(sys.stdout, "reconfigure", None)
-        if callable(reconfigure_stdout):
-            reconfigure_stdout(encoding="utf-8", errors="replace")
-    except Exception:
-        pass
+        urls = load_urls_from_json(job.input_path)
+    except FileNotFoundError:
+        print(f"[{label}] SKIP: input file not found ({job.input_path}).")
+        return 0, 0, []
+    except Exception as exc:
+        print(f"[{label}] SKIP: failed to read input JSON ({exc})")
+        return 0, 0, []
+
+    total = len(urls)
+    print(f"[{label}] Checking {total} URL(s)...")
+    if total == 0:
+        save_urls_to_json(job.output_path, [])
+        print(f"[{label}] No URLs found. Saved empty output.")
+        return 0, 0, []
+
+    completed_results = await run_checks(
+        session=session,
+        semaphore=semaphore,
+        host_slots=host_slots,
+        label=label,
+        urls=urls,
+        timeout_seconds=timeout_seconds,
+        retries=retries,
+        segment_sample_count=segment_sample_count,
+        min_successful_segments=min_successful_segments,
+        max_segment_duration=max_segment_duration,
+        segment_probe_bytes=segment_probe_bytes,
+    )
+    processed_total = len(completed_results)
+    if processed_total != total:
+        print(f"[{label}] WARNING: processed {processed_total} of {total} URL(s).")
+
+    valid_rows, failed_rows = rank_results(completed_results)
+    save_urls_to_json(job.output_path, [row.url for row in valid_rows])
+
+    print(f"[{label}] Processed: {processed_total}/{total}")
+    print(f"[{label}] Done: {len(valid_rows)}/{total} URL(s) passed playback-risk check.")
+    print(f"[{label}] Saved sorted working URLs to: {job.output_path}")
+    if valid_rows:
+        print(f"[{label}] Top 10 by quality score:")
+        for row in valid_rows[:10]:
+            print(
+                f"[{label}] - score={row.score:.1f}, ratio={row.throughput_ratio:.2f}, "
+                f"jitter={row.jitter_ratio:.2f}, url={row.url}"
+            )
+    return total, len(valid_rows), [row.url for row in failed_rows]
+
+
+async def amain() -> int:
+    total_started_at = time.perf_counter()
 
     timeout_seconds = _positive_float_setting("CHECK_M3U8_TIMEOUT_SECONDS", 5.0)
     retries = get_timeout_retries()
-    max_workers_setting = get_max_workers()
+    max_workers = get_max_workers()
+    per_host_limit = min(get_per_host_limit(), max_workers)
     segment_sample_count = get_segment_sample_count()
     min_successful_segments = get_min_successful_segments()
     max_segment_duration = get_max_segment_duration()
+    segment_probe_bytes = get_segment_probe_bytes()
     source_jobs = get_source_jobs()
-    total_input_urls = 0
-    total_output_urls = 0
-    all_failed_urls: list[str] = []
 
     print(f"Source files to process: {len(source_jobs)}")
     print(
-        f"Workers: up to {max_workers_setting}, timeout: {timeout_seconds}s, retries: {retries}, "
+        f"Workers: up to {max_workers} ({per_host_limit} per host), "
+        f"timeout: {timeout_seconds}s, retries: {retries}, "
         f"segment sample: {segment_sample_count}, min successful: {min_successful_segments}, "
         f"max segment duration: {max_segment_duration}s"
     )
-
     for idx, job in enumerate(source_jobs, start=1):
-        print(f"\n=== Source {idx}/{len(source_jobs)} ===")
-        print(f"Input:  {job.input_path}")
-        print(f"Output: {job.output_path}")
-        if not job.input_path.exists():
-            print("SKIP: input file not found.")
-            continue
+        print(f"Source {idx}/{len(source_jobs)}: {job.input_path} -> {job.output_path}")
 
-        try:
-            urls = load_urls_from_json(job.input_path)
-        except Exception as exc:
-            print(f"SKIP: failed to read input JSON ({exc})")
-            continue
-
-        total = len(urls)
-        total_input_urls += total
-        max_workers = min(max_workers_setting, total or 1)
-        print(f"Checking {total} URL(s)...")
-        if total == 0:
-            save_urls_to_json(job.output_path, [])
-            print("No URLs found. Saved empty output.")
-            continue
+    headers = {
+        "User-Agent": getattr(settings, "DEFAULT_USER_AGENT", "Mozilla/5.0"),
+        "Accept": getattr(settings, "DEFAULT_ACCEPT_HEADER", "*/*"),
+    }
+    # A check holds at most one connection at a time, so a pool as large as the worker cap
+    # never makes a request wait for a connection; that wait would count against its timeout.
+    connector = aiohttp.TCPConnector(
+        limit=max_workers,
+        limit_per_host=max_workers,
+        resolver=_build_resolver(),
+        use_dns_cache=True,
+        ttl_dns_cache=300,
+        enable_cleanup_closed=True,
+        force_close=False,
+    )
+    # Shared by every job, so sources run side by side without exceeding the worker cap.
+    semaphore = asyncio.Semaphore(max_workers)
+    # Many URLs in one list share a CDN; cap checks per host below the global limit so a
+    # single origin cannot take every slot and start throttling us.
+    host_slots: defaultdict[str, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(per_host_limit)
+    )
 
-        try:
-            completed_results = asyncio.run(
-                run_checks(
-                    urls=urls,
+    # One session for all jobs keeps the DNS cache and keep-alive pool warm between sources.
+    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+        job_results = await asyncio.gather(
+            *(
+                run_checks_for_job(
+                    session=session,
+                    semaphore=semaphore,
+                    host_slots=host_slots,
+                    job=job,
                     timeout_seconds=timeout_seconds,
-                    max_workers=max_workers,
                     retries=retries,
                     segment_sample_count=segment_sample_count,
                     min_successful_segments=min_successful_segments,
                     max_segment_duration=max_segment_duration,
+                    segment_probe_bytes=segment_probe_bytes,
                 )
-            )
-        except KeyboardInterrupt:
-            print("\nStopped by user (Ctrl+C).")
-            return 130
-        processed_total = len(completed_results)
-        if processed_total != total:
-            print(f"WARNING: processed {processed_total} of {total} URL(s).")
-
-        valid_rows = [row for row in completed_results if row.ok]
-        failed_rows = [row for row in completed_results if not row.ok]
-        valid_rows.sort(
-            key=lambda row: (
-                -row.score,
-                -row.throughput_ratio,
-                row.jitter_ratio,
-                row.elapsed,
-                row.url,
+                for job in source_jobs
             )
         )
-        sorted_urls = [row.url for row in valid_rows]
-        all_failed_urls.extend(row.url for row in failed_rows)
-        save_urls_to_json(job.output_path, sorted_urls)
-        total_output_urls += len(sorted_urls)
-
-        print(f"Processed: {processed_total}/{total}")
-        print(f"Done: {len(valid_rows)}/{total} URL(s) passed playback-risk check.")
-        print(f"Saved sorted working URLs to: {job.output_path}")
-        if valid_rows:
-            print("Top 10 by quality score:")
-            for row in valid_rows[:10]:
-                print(
-                    f"- score={row.score:.1f}, ratio={row.throughput_ratio:.2f}, "
-                    f"jitter={row.jitter_ratio:.2f}, url={row.url}"
-                )
 
+    total_input_urls = sum(input_count for input_count, _, _ in job_results)
+    total_output_urls = sum(output_count for _, output_count, _ in job_results)
+    all_failed_urls = [url for _, _, failed_urls in job_results for url in failed_urls]
     added_to_blacklist = save_blacklist_with_merge(BLACKLIST_PATH, all_failed_urls)
     total_elapsed = time.perf_counter() - total_started_at
     print("\n=== Summary ===")
@@ -687,5 +815,20 @@ def main() -> int:
     return 0
 
 
+def main() -> int:
+    try:
+        reconfigure_stdout = getattr(sys.stdout, "reconfigure", None)
+        if callable(reconfigure_stdout):
+            reconfigure_stdout(encoding="utf-8", errors="replace")
+    except Exception:
+        pass
+
+    try:
+        return _run(amain())
+    except KeyboardInterrupt:
+        print("\nStopped by user (Ctrl+C).")
+        return 130
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -2,7 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import json
+import os
 import sys
+from itertools import chain
 from pathlib import Path
 from typing import Any
 
@@ -76,15 +78,17 @@ def load_urls_from_json(path: Path) -> list[str]:
 
 def save_urls_to_json(path: Path, urls: list[str]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
+    # Write-then-rename so a crash mid-write never leaves a truncated whitelist behind.
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(urls, f, ensure_ascii=False, indent=2)
         f.write("\n")
+    os.replace(tmp_path, path)
 
 
 def main() -> None:
     source_jobs = get_source_jobs()
-    merged_urls: list[str] = []
-    seen: set[str] = set()
+    all_lists: list[list[str]] = []
     total_seen_in_sources = 0
     processed_files = 0
 
@@ -92,23 +96,21 @@ def main() -> None:
     for idx, job in enumerate(source_jobs, start=1):
         path = job.input_path
         print(f"[{idx}/{len(source_jobs)}] {path}")
-        if not path.exists():
-            print("SKIP: input file not found.")
-            continue
         try:
             urls = load_urls_from_json(path)
+        except FileNotFoundError:
+            print("SKIP: input file not found.")
+            continue
         except Exception as exc:
             print(f"SKIP: failed to read input JSON ({exc})")
             continue
 
         processed_files += 1
         total_seen_in_sources += len(urls)
-        for url in urls:
-            if url in seen:
-                continue
-            seen.add(url)
-            merged_urls.append(url)
+        print(f"URLs: {len(urls)}")
+        all_lists.append(urls)
 
+    merged_urls = list(dict.fromkeys(chain.from_iterable(all_lists)))
     save_urls_to_json(WHITELIST_PATH, merged_urls)
 
     print("\n=== Summary ===")
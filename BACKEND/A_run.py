@@ -1,38 +1,49 @@
 #!/usr/bin/env python3
 
-import subprocess
+import importlib
 import sys
+import traceback
 from pathlib import Path
 
+BACKEND_DIR = Path(__file__).resolve().parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
 
-def run_script(script_path: Path) -> None:
-    print(f"Running: {script_path.name}")
-    subprocess.run([sys.executable, str(script_path)], check=True)
-    print(f"Completed: {script_path.name}\n")
+
+def run_stage(module_name: str) -> int:
+    print(f"Running: {module_name}.py")
+    # Stages run in this interpreter: no per-script startup or repeated SETTINGS import.
+    module = importlib.import_module(module_name)
+    result = module.main()
+    print(f"Completed: {module_name}.py\n")
+    return result if isinstance(result, int) else 0
 
 
 def main() -> int:
-    project_root = Path(__file__).resolve().parent.parent
-    scripts_to_run = [
-        "BACKEND/AA_check_all_existing.py",
-        "BACKEND/AB_update_WHITELIST.py",
-        "BACKEND/BA_from_repos_to_TEMP_LIST.py",
-        "BACKEND/BB_from_TEMP_LIST_to_TEMP_CHECKED.py",
-        "BACKEND/BC_from_TEMP_CHECKED_to_ALL.py",
+    stages_to_run = [
+        "AA_check_all_existing",
+        "AB_update_WHITELIST",
+        "BA_from_repos_to_TEMP_LIST",
+        "BB_from_TEMP_LIST_to_TEMP_CHECKED",
+        "BC_from_TEMP_CHECKED_to_ALL",
     ]
 
-    try:
-        for script_rel_path in scripts_to_run:
-            run_script(project_root / script_rel_path)
-    except KeyboardInterrupt:
-        print("\nStopped by user (Ctrl+C).")
-        return 130
-    except subprocess.CalledProcessError as exc:
-        if exc.returncode == 130:
+    for module_name in stages_to_run:
+        try:
+            returncode = run_stage(module_name)
+        except KeyboardInterrupt:
+            print("\nStopped by user (Ctrl+C).")
+            return 130
+        except Exception as exc:
+            traceback.print_exc()
+            print(f"Failed: {module_name}.py ({exc})")
+            return 1
+        if returncode == 130:
             print("\nStopped by user (Ctrl+C).")
             return 130
-        print(f"Failed: {exc}")
-        return exc.returncode if isinstance(exc.returncode, int) else 1
+        if returncode != 0:
+            print(f"Failed: {module_name}.py exited with code {returncode}")
+            return returncode
 
     print("All done.")
     return 0
@@ -1,11 +1,44 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
+import asyncio
+import gzip
+import hashlib
+import importlib.util
+import io
 import re
 import sys
+import tarfile
+import time
+import zlib
 from pathlib import Path
-from urllib import error, parse, request
+from urllib import parse
+
+import httpx
+
+try:
+    # uvloop is a drop-in, faster event loop; it is not available on Windows.
+    import uvloop
+
+    # uvloop.run only exists from uvloop 0.18 on.
+    _run = getattr(uvloop, "run", asyncio.run)
+except ImportError:
+    _run = asyncio.run
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(data):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    import json
+
+    _loads = json.loads
+
+    def _dumps(data):
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
@@ -14,9 +47,33 @@ if str(PROJECT_ROOT) not in sys.path:
 import SETTINGS as settings
 
 OUTPUT_JSON_FILE = Path("DATA/CHECK/TEMP_LIST.json").resolve()
+HTTP_CACHE_INDEX_FILE = PROJECT_ROOT / "DATA" / "CHECK" / ".http_cache.json"
+HTTP_CACHE_BODY_DIR = PROJECT_ROOT / "DATA" / "CHECK" / ".http_cache"
 DEFAULT_LINK_PATTERN = r'https?://[^\s)"]+?\.m3u8(?:\?[^\s)"]*)?'
 DEFAULT_TIMEOUT = 20
+DEFAULT_HTTP_CACHE_TTL = 300
 MD_ACTIVE_LINK_PATTERN = re.compile(r"\[\>\]\((https?://[^)]+)\)")
+LINK_PATTERN = re.compile(getattr(settings, "GET_M3U8_LINK_PATTERN", DEFAULT_LINK_PATTERN))
+# Case-insensitive ".md" suffix test without allocating a lowercased copy of each name.
+_MD_SUFFIXES = (".md", ".MD", ".Md", ".mD")
+# Playlist scanning works on raw bytes; only matching lines are decoded.
+_HTTP_PREFIXES = (b"http://", b"https://")
+_M3U8_BYTES_RE = re.compile(rb"\.m3u8", re.IGNORECASE)
+MAX_CONNECTIONS = 64
+CONNECT_TIMEOUT = 3.05
+# Connection failures are retried by the transport; these statuses are retried in _send.
+TRANSPORT_RETRIES = 3
+RETRY_STATUSES = frozenset({502, 503, 504})
+RETRY_BACKOFF_SECONDS = 0.3
+# HTTP/2 multiplexes the burst of raw.githubusercontent.com fetches over one TLS session;
+# it needs the optional h2 package (httpx[http2]).
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+GITHUB_API_HOST = "api.github.com"
+GITHUB_TOKEN = getattr(settings, "GITHUB_TOKEN", "")
+# Unauthenticated api.github.com traffic is rate limited; keep its fan-out small.
+GITHUB_API_SEMAPHORE = asyncio.Semaphore(8)
+# url -> {"etag", "last_modified", "body_sha", "body_path", "gzip", "fetched_at"}; loaded once per run.
+HTTP_CACHE = {}
 
 
 def is_direct_playlist_url(source):
@@ -48,25 +105,126 @@ def parse_github_repo(repo_url):
     return owner, repo
 
 
-def fetch_json(url, timeout):
-    req = request.Request(
+def load_http_cache():
+    HTTP_CACHE.clear()
+    try:
+        data = _loads(HTTP_CACHE_INDEX_FILE.read_bytes())
+    except (OSError, ValueError):
+        return
+    if isinstance(data, dict):
+        HTTP_CACHE.update(data)
+
+
+def save_http_cache():
+    HTTP_CACHE_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    HTTP_CACHE_INDEX_FILE.write_bytes(_dumps(HTTP_CACHE))
+
+
+def _read_cached_body(entry):
+    try:
+        body = (HTTP_CACHE_BODY_DIR / entry["body_path"]).read_bytes()
+        if entry.get("gzip"):
+            body = gzip.decompress(body)
+    except (OSError, EOFError, zlib.error, KeyError, TypeError):
+        return None
+    if hashlib.sha256(body).hexdigest() != entry.get("body_sha"):
+        return None
+    return body
+
+
+def _store_cached_body(url, response):
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return
+    body = response.content
+    body_path = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    # Markdown and JSON bodies shrink several-fold; codeload tarballs are gzip already.
+    compress = not body.startswith(b"\x1f\x8b")
+    HTTP_CACHE_BODY_DIR.mkdir(parents=True, exist_ok=True)
+    (HTTP_CACHE_BODY_DIR / body_path).write_bytes(
+        gzip.compress(body, compresslevel=6) if compress else body
+    )
+    HTTP_CACHE[url] = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "body_sha": hashlib.sha256(body).hexdigest(),
+        "body_path": body_path,
+        "gzip": compress,
+        "fetched_at": time.time(),
+    }
+
+
+async def _send_once(client, url, headers):
+    if parse.urlsplit(url).hostname == GITHUB_API_HOST:
+        if GITHUB_TOKEN:
+            headers = {**headers, "Authorization": f"Bearer {GITHUB_TOKEN}"}
+        async with GITHUB_API_SEMAPHORE:
+            return await client.get(url, headers=headers)
+    return await client.get(url, headers=headers)
+
+
+async def _send(client, url, headers):
+    for attempt in range(TRANSPORT_RETRIES):
+        response = await _send_once(client, url, headers)
+        if response.status_code not in RETRY_STATUSES:
+            return response
+        await asyncio.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt))
+    return await _send_once(client, url, headers)
+
+
+async def _get(client, url, headers):
+    """GET url and return the body, revalidating a cached copy with ETag/Last-Modified.
+
+    GitHub answers unchanged resources with 304, which does not count against the rate limit.
+    """
+    entry = HTTP_CACHE.get(url)
+    if entry and time.time() - entry.get("fetched_at", 0) < get_http_cache_ttl():
+        # Fresh enough: skip the network entirely, not even a conditional request.
+        body = _read_cached_body(entry)
+        if body is not None:
+            return body
+    if entry:
+        conditional = dict(headers)
+        if entry.get("etag"):
+            conditional["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            conditional["If-Modified-Since"] = entry["last_modified"]
+        response = await _send(client, url, conditional)
+        if response.status_code == 304:
+            body = _read_cached_body(entry)
+            if body is not None:
+                entry["fetched_at"] = time.time()
+                return body
+            HTTP_CACHE.pop(url, None)
+            response = await _send(client, url, headers)
+    else:
+        response = await _send(client, url, headers)
+    response.raise_for_status()
+    _store_cached_body(url, response)
+    return response.content
+
+
+async def fetch_json(client, url):
+    body = await _get(
+        client,
         url,
-        headers={
+        {
             "Accept": "application/vnd.github+json",
             "User-Agent": settings.GET_MD_LIST_USER_AGENT,
         },
     )
-    with request.urlopen(req, timeout=timeout) as response:
-        return json.loads(response.read().decode("utf-8"))
+    return _loads(body)
 
 
-def fetch_text(url, timeout):
-    req = request.Request(
-        url,
-        headers={"User-Agent": settings.GET_M3U8_USER_AGENT},
-    )
-    with request.urlopen(req, timeout=timeout) as response:
-        return response.read().decode("utf-8", errors="replace")
+async def fetch_text(client, url):
+    body = await _get(client, url, {"User-Agent": settings.GET_M3U8_USER_AGENT})
+    return body.decode("utf-8", errors="replace")
+
+
+def get_http_cache_ttl():
+    value = getattr(settings, "GET_M3U8_HTTP_CACHE_TTL_SECONDS", DEFAULT_HTTP_CACHE_TTL)
+    return value if isinstance(value, (int, float)) and value >= 0 else DEFAULT_HTTP_CACHE_TTL
 
 
 def get_timeout():
@@ -74,111 +232,195 @@ def get_timeout():
     return value if isinstance(value, (int, float)) and value > 0 else DEFAULT_TIMEOUT
 
 
-def get_repo_default_branch(owner, repo):
+async def get_repo_default_branch(client, owner, repo):
     meta_url = f"https://api.github.com/repos/{owner}/{repo}"
-    payload = fetch_json(meta_url, get_timeout())
+    payload = await fetch_json(client, meta_url)
     return payload.get("default_branch", "master")
 
 
 def extract_m3u8_links_from_text(text):
-    pattern = getattr(settings, "GET_M3U8_LINK_PATTERN", DEFAULT_LINK_PATTERN)
-    links = re.findall(pattern, text)
-    return [link for link in links if ".m3u8" in link.lower()]
+    # A substring search runs at memchr speed; skip the regex scan when no link can match.
+    if ".m3u8" not in text and not LINK_PATTERN.flags & re.IGNORECASE:
+        return []
+    return [link for link in LINK_PATTERN.findall(text) if ".m3u8" in link.lower()]
 
 
 def dedupe_keep_order(links):
-    seen = set()
-    result = []
-    for link in links:
-        normalized = link.strip()
-        if not normalized or normalized in seen:
-            continue
-        seen.add(normalized)
-        result.append(normalized)
-    return result
+    return list(dict.fromkeys(filter(None, map(str.strip, links))))
 
 
-def collect_from_playlist_file(owner, repo, branch):
-    raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/playlist.m3u8"
-    text = fetch_text(raw_url, get_timeout())
-    links = []
-    for line in text.splitlines():
+async def _iter_byte_lines(chunks):
+    pending = b""
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+async def _scan_playlist_lines(lines):
+    """Yield unique http(s) .m3u8 entries from an async iterator of playlist byte lines."""
+    seen = set()
+    async for line in lines:
         line = line.strip()
-        if not line or line.startswith("#"):
+        if not line or line.startswith(b"#") or line in seen:
             continue
-        if line.lower().startswith(("http://", "https://")) and ".m3u8" in line.lower():
-            links.append(line)
-    return dedupe_keep_order(links)
+        # Lowercase only the 8-byte scheme prefix; the extension check is a case-insensitive search.
+        if line[:8].lower().startswith(_HTTP_PREFIXES) and _M3U8_BYTES_RE.search(line):
+            seen.add(line)
+            yield line.decode("utf-8", errors="replace")
 
 
-def collect_from_lists_md(owner, repo):
-    lists_api = f"https://api.github.com/repos/{owner}/{repo}/contents/lists"
-    items = fetch_json(lists_api, get_timeout())
-    md_items = [
-        item for item in items
-        if item.get("type") == "file" and str(item.get("name", "")).lower().endswith(".md")
-    ]
+async def stream_playlist_links(client, playlist_url):
+    # Lines are scanned as they arrive, so large playlists are never held in memory whole.
+    headers = {"User-Agent": settings.GET_M3U8_USER_AGENT}
+    async with client.stream("GET", playlist_url, headers=headers) as response:
+        response.raise_for_status()
+        lines = _iter_byte_lines(response.aiter_bytes())
+        return [link async for link in _scan_playlist_lines(lines)]
 
-    links = []
-    for item in md_items:
-        download_url = item.get("download_url")
-        if not download_url:
-            continue
-        try:
-            text = fetch_text(download_url, get_timeout())
-        except (error.URLError, TimeoutError, ValueError):
-            continue
 
+async def collect_from_playlist_file(client, owner, repo, branch):
+    raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/playlist.m3u8"
+    return await stream_playlist_links(client, raw_url)
+
+
+def _extract_active_md_links(texts):
+    links = []
+    for text in texts:
         for match in MD_ACTIVE_LINK_PATTERN.findall(text):
             if ".m3u8" in match.lower():
                 links.append(match.strip())
     return dedupe_keep_order(links)
 
 
-def collect_from_direct_playlist_url(playlist_url):
-    text = fetch_text(playlist_url, get_timeout())
-    links = []
-    for line in text.splitlines():
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-        if line.lower().startswith(("http://", "https://")) and ".m3u8" in line.lower():
-            links.append(line)
-    return dedupe_keep_order(links)
+def _read_lists_md_from_tarball(body):
+    """Return the texts of <root>/lists/*.md from a gzipped repo snapshot, sorted by path."""
+    texts = []
+    with tarfile.open(fileobj=io.BytesIO(body), mode="r:gz") as archive:
+        members = sorted(
+            (
+                member for member in archive
+                if member.isfile()
+                and member.name.count("/") == 2
+                and member.name.split("/")[1] == "lists"
+                and member.name.endswith(_MD_SUFFIXES)
+            ),
+            key=lambda member: member.name,
+        )
+        for member in members:
+            texts.append(archive.extractfile(member).read().decode("utf-8", errors="replace"))
+    if not texts:
+        raise ValueError("No lists/*.md files in repository snapshot")
+    return texts
+
+
+async def collect_from_lists_tarball(client, owner, repo, branch):
+    # One codeload request replaces the contents listing plus one fetch per markdown file.
+    tarball_url = f"https://codeload.github.com/{owner}/{repo}/tar.gz/{branch}"
+    body = await _get(client, tarball_url, {"User-Agent": settings.GET_M3U8_USER_AGENT})
+    texts = await asyncio.to_thread(_read_lists_md_from_tarball, body)
+    return _extract_active_md_links(texts)
+
+
+async def collect_from_lists_md(client, owner, repo, branch):
+    try:
+        return await collect_from_lists_tarball(client, owner, repo, branch)
+    except (httpx.HTTPError, tarfile.TarError, OSError, ValueError):
+        pass
 
+    lists_api = f"https://api.github.com/repos/{owner}/{repo}/contents/lists"
+    items = await fetch_json(client, lists_api)
+    if not isinstance(items, list):
+        raise ValueError(f"Unexpected contents listing for {owner}/{repo}/lists")
+    # Single pass over the parsed listing; only the three fields we need are touched.
+    texts = await asyncio.gather(
+        *(
+            fetch_text(client, item["download_url"]) for item in items
+            if item.get("type") == "file"
+            and item.get("download_url")
+            and str(item.get("name", "")).endswith(_MD_SUFFIXES)
+        ),
+        return_exceptions=True,
+    )
+
+    for text in texts:
+        if isinstance(text, BaseException) and not isinstance(text, (httpx.HTTPError, ValueError)):
+            raise text
+    return _extract_active_md_links(text for text in texts if isinstance(text, str))
+
+
+async def collect_from_direct_playlist_url(client, playlist_url):
+    return await stream_playlist_links(client, playlist_url)
 
-def collect_links_from_repo(repo_url):
+
+async def collect_links_from_repo(client, repo_url):
     owner, repo = parse_github_repo(repo_url)
-    branch = get_repo_default_branch(owner, repo)
+    branch = await get_repo_default_branch(client, owner, repo)
 
     try:
         # For Free-TV/IPTV this is the canonical generated source of included channels.
-        return collect_from_playlist_file(owner, repo, branch), "playlist.m3u8"
+        return await collect_from_playlist_file(client, owner, repo, branch), "playlist.m3u8"
     except Exception:
         pass
 
     try:
         # Fallback to source markdown with only active `[>]` entries.
-        return collect_from_lists_md(owner, repo), "lists/*.md [>]"
+        return await collect_from_lists_md(client, owner, repo, branch), "lists/*.md [>]"
     except Exception:
         pass
 
     # Last fallback: shallow scan of README text only.
     readme_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/README.md"
-    text = fetch_text(readme_url, get_timeout())
+    text = await fetch_text(client, readme_url)
     return dedupe_keep_order(extract_m3u8_links_from_text(text)), "README.md"
 
 
-def collect_links_from_source(source):
+async def collect_links_from_source(client, source):
     if is_direct_playlist_url(source):
-        return collect_from_direct_playlist_url(source), "direct .m3u/.m3u8 url"
-    return collect_links_from_repo(source)
+        return await collect_from_direct_playlist_url(client, source), "direct .m3u/.m3u8 url"
+    return await collect_links_from_repo(client, source)
+
+
+async def scan_source(client, source):
+    try:
+        return await collect_links_from_source(client, source), None
+    except Exception as exc:
+        return None, exc
 
 
 def write_links(output_file, links):
+    payload = _dumps(links)
+    try:
+        # TEMP_LIST is rebuilt from scratch each run; leave the file alone if nothing changed.
+        if output_file.read_bytes() == payload:
+            return
+    except OSError:
+        pass
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(links, f, ensure_ascii=False, indent=2)
+    output_file.write_bytes(payload)
+
+
+async def scan_sources(source_items):
+    load_http_cache()
+    # Limits and HTTP/2 belong to the transport once one is passed explicitly.
+    transport = httpx.AsyncHTTPTransport(
+        retries=TRANSPORT_RETRIES,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS),
+        http2=HTTP2_ENABLED,
+    )
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(get_timeout(), connect=CONNECT_TIMEOUT),
+        transport=transport,
+        follow_redirects=True,
+        headers={"User-Agent": settings.GET_M3U8_USER_AGENT},
+    ) as client:
+        # All sources are fetched side by side; results keep the configured order.
+        scanned = await asyncio.gather(*(scan_source(client, source) for source in source_items))
+    save_http_cache()
+    return scanned
 
 
 def main():
@@ -188,27 +430,24 @@ def main():
         write_links(OUTPUT_JSON_FILE, [])
         return
 
-    all_links = []
-    global_seen = set()
+    # Insertion-ordered dict doubles as the seen-set across sources.
+    all_links = {}
 
-    for source in source_items:
+    scanned = _run(scan_sources(source_items))
+    for source, (result, exc) in zip(source_items, scanned):
         print(f"Scanning source: {source}")
-        try:
-            repo_links, source_name = collect_links_from_source(source)
-        except Exception as exc:
+        if exc is not None:
             print(f"  Failed: {exc}")
             continue
+        repo_links, source_name = result
 
-        new_count = 0
-        for link in repo_links:
-            if link not in global_seen:
-                global_seen.add(link)
-                all_links.append(link)
-                new_count += 1
+        known_count = len(all_links)
+        all_links.update(dict.fromkeys(repo_links))
+        new_count = len(all_links) - known_count
         print(f"  Source: {source_name}")
         print(f"  Found new links: {new_count}")
 
-    write_links(OUTPUT_JSON_FILE, all_links)
+    write_links(OUTPUT_JSON_FILE, list(all_links))
     print(f"Done. Saved {len(all_links)} link(s) to: {OUTPUT_JSON_FILE}")
 
 
@@ -1,9 +1,23 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 from pathlib import Path
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(data) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    import json
+
+    _loads = json.loads
+
+    def _dumps(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 TEMP_LIST_PATH = PROJECT_ROOT / "DATA" / "CHECK" / "TEMP_LIST.json"
@@ -12,45 +26,33 @@ BLACKLIST_PATH = PROJECT_ROOT / "DATA" / "CHECK" / "BLACKLIST.json"
 WHITELIST_PATH = PROJECT_ROOT / "DATA" / "CHECK" / "WHITELIST.json"
 
 
-def normalize(value) -> str:
-    return str(value).strip()
-
-
 def load_json_list(path: Path):
-    with path.open("r", encoding="utf-8") as file:
-        data = json.load(file)
+    data = _loads(path.read_bytes())
     if not isinstance(data, list):
         raise ValueError(f"{path} must contain a JSON array.")
-    return data
+    return [item for item in data if isinstance(item, str)]
 
 
 def save_json_list(path: Path, data) -> None:
-    with path.open("w", encoding="utf-8") as file:
-        json.dump(data, file, ensure_ascii=False, indent=2)
-        file.write("\n")
+    path.write_bytes(_dumps(data) + b"\n")
 
 
 def merge_blacklist(existing_blacklist, excluded_items):
-    merged = []
-    seen = set()
-
+    # Insertion-ordered dict keyed by the normalized URL keeps the first original item.
+    merged = {}
+    strip = str.strip
     for item in existing_blacklist:
-        key = normalize(item)
-        if not key or key in seen:
-            continue
-        seen.add(key)
-        merged.append(item)
+        key = strip(item)
+        if key:
+            merged.setdefault(key, item)
 
-    added = 0
+    existing_count = len(merged)
     for item in excluded_items:
-        key = normalize(item)
-        if not key or key in seen:
-            continue
-        seen.add(key)
-        merged.append(item)
-        added += 1
+        key = strip(item)
+        if key:
+            merged.setdefault(key, item)
 
-    return merged, added
+    return list(merged.values()), len(merged) - existing_count
 
 
 def main() -> None:
@@ -58,21 +60,21 @@ def main() -> None:
     blacklist = load_json_list(BLACKLIST_PATH)
     whitelist = load_json_list(WHITELIST_PATH)
 
-    excluded_set = {normalize(item) for item in blacklist}
-    excluded_set.update(normalize(item) for item in whitelist)
+    strip = str.strip
+    excluded_set = frozenset(map(strip, blacklist)) | frozenset(map(strip, whitelist))
 
-    filtered_temp_list = [
-        item for item in temp_list if normalize(item) not in excluded_set
-    ]
-    excluded_items = [
-        item for item in temp_list if normalize(item) in excluded_set
-    ]
+    # One pass, one strip() per item.
+    filtered_temp_list = []
+    excluded_items = []
+    for item in temp_list:
+        (excluded_items if strip(item) in excluded_set else filtered_temp_list).append(item)
 
     removed_count = len(temp_list) - len(filtered_temp_list)
     updated_blacklist, added_to_blacklist = merge_blacklist(blacklist, excluded_items)
 
     save_json_list(TEMP_CHECKED_PATH, filtered_temp_list)
-    save_json_list(BLACKLIST_PATH, updated_blacklist)
+    if updated_blacklist != blacklist:
+        save_json_list(BLACKLIST_PATH, updated_blacklist)
 
     print(f"Temp list before: {len(temp_list)}")
     print(f"Blacklist: {len(blacklist)}")
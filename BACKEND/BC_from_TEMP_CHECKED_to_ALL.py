@@ -5,12 +5,22 @@ import json
 import statistics
 import sys
 import time
+from collections import defaultdict
 from pathlib import Path
 from typing import Any
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 
 import aiohttp
 
+try:
+    # uvloop is a drop-in, faster event loop; it is not available on Windows.
+    import uvloop
+
+    # uvloop.run only exists from uvloop 0.18 on.
+    _run = getattr(uvloop, "run", asyncio.run)
+except ImportError:
+    _run = asyncio.run
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
@@ -22,6 +32,8 @@ DEFAULT_TIMEOUT_RETRIES = 2
 DEFAULT_SEGMENT_SAMPLE_COUNT = 3
 DEFAULT_MIN_SUCCESSFUL_SEGMENTS = 2
 DEFAULT_MAX_SEGMENT_DURATION = 10.0
+DEFAULT_PER_HOST_LIMIT = 8
+DEFAULT_SEGMENT_PROBE_BYTES = 262144
 
 SOURCE_JSON_FILE = Path("DATA/CHECK/TEMP_CHECKED.json").resolve()
 TARGET_JSON_FILE = Path("DATA/LISTS/ALL.json").resolve()
@@ -79,6 +91,14 @@ def get_max_workers() -> int:
     return _positive_int_setting("CHECK_M3U8_MAX_WORKERS", DEFAULT_MAX_WORKERS)
 
 
+def get_per_host_limit() -> int:
+    return _positive_int_setting("CHECK_M3U8_PER_HOST_LIMIT", DEFAULT_PER_HOST_LIMIT)
+
+
+def get_segment_probe_bytes() -> int:
+    return _positive_int_setting("CHECK_M3U8_SEGMENT_PROBE_BYTES", DEFAULT_SEGMENT_PROBE_BYTES)
+
+
 def get_timeout_retries() -> int:
     return _positive_int_setting("CHECK_M3U8_TIMEOUT_RETRIES", DEFAULT_TIMEOUT_RETRIES)
 
@@ -174,7 +194,11 @@ async def _fetch_text(
 
 
 async def _download_segment(
-    session: aiohttp.ClientSession, url: str, timeout_seconds: float, retries: int
+    session: aiohttp.ClientSession,
+    url: str,
+    timeout_seconds: float,
+    retries: int,
+    probe_bytes: int,
 ) -> tuple[bool, str, float, int]:
     timeout = aiohttp.ClientTimeout(total=timeout_seconds)
     for attempt in range(1, retries + 1):
@@ -183,9 +207,26 @@ async def _download_segment(
             async with session.get(url, timeout=timeout) as response:
                 if response.status != 200:
                     return False, f"segment HTTP {response.status} (try {attempt}/{retries})", 0.0, 0
-                payload = await response.read()
-                elapsed = max(time.perf_counter() - started, 0.001)
-                return True, "segment OK", elapsed, len(payload)
+                headers_at = time.perf_counter()
+                # Stop early only when the real size is known and the transfer can be extrapolated;
+                # chunked or content-encoded segments are read in full.
+                full_size = response.content_length
+                if "Content-Encoding" in response.headers:
+                    full_size = None
+                limit = probe_bytes if full_size else None
+                received = 0
+                async for chunk in response.content.iter_chunked(65536):
+                    received += len(chunk)
+                    if limit is not None and received >= limit:
+                        break
+                transfer = time.perf_counter() - headers_at
+                if full_size and full_size > received > 0:
+                    # Probe stopped early: extrapolate the transfer to the whole segment so
+                    # download ratios and bitrate estimates stay comparable to a full read.
+                    transfer *= full_size / received
+                    received = full_size
+                elapsed = max(headers_at - started + transfer, 0.001)
+                return True, "segment OK", elapsed, received
         except asyncio.TimeoutError:
             continue
         except aiohttp.ClientError as exc:
@@ -235,6 +276,7 @@ async def check_stream_quality(
     segment_sample_count: int,
     min_successful_segments: int,
     max_segment_duration: float,
+    segment_probe_bytes: int,
 ) -> StreamCheckResult:
     started = time.perf_counter()
 
@@ -320,7 +362,7 @@ async def check_stream_quality(
     errors: list[str] = []
     for seg_url, seg_duration in sampled:
         seg_ok, seg_reason, seg_elapsed, seg_bytes = await _download_segment(
-            session, seg_url, timeout_seconds, retries
+            session, seg_url, timeout_seconds, retries, segment_probe_bytes
         )
         if not seg_ok or seg_bytes <= 0:
             errors.append(seg_reason)
@@ -431,58 +473,63 @@ async def run_checks(
     urls: list[str],
     timeout_seconds: float,
     max_workers: int,
+    per_host_limit: int,
     retries: int,
     segment_sample_count: int,
     min_successful_segments: int,
     max_segment_duration: float,
+    segment_probe_bytes: int,
 ) -> list[StreamCheckResult]:
     headers = {
         "User-Agent": getattr(settings, "DEFAULT_USER_AGENT", "Mozilla/5.0"),
         "Accept": getattr(settings, "DEFAULT_ACCEPT_HEADER", "*/*"),
     }
+    # A check holds at most one connection at a time, so this pool never makes a request
+    # wait for a connection; that wait would count against its timeout.
     connector = aiohttp.TCPConnector(limit=max_workers, limit_per_host=max_workers)
     results: list[StreamCheckResult | None] = [None] * len(urls)
     done = 0
+    semaphore = asyncio.Semaphore(max_workers)
+    # Many URLs share a CDN; cap checks per host below the global limit.
+    host_limit = min(per_host_limit, max_workers)
+    host_slots: defaultdict[str, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(host_limit)
+    )
 
     async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
         async def run_one(index: int, url: str) -> tuple[int, StreamCheckResult]:
-            row = await check_stream_quality(
-                session=session,
-                url=url,
-                timeout_seconds=timeout_seconds,
-                retries=retries,
-                segment_sample_count=segment_sample_count,
-                min_successful_segments=min_successful_segments,
-                max_segment_duration=max_segment_duration,
-            )
+            # Host slot first, before any timer starts, so a busy CDN's queue is not timed.
+            async with host_slots[urlsplit(url).hostname or ""], semaphore:
+                row = await check_stream_quality(
+                    session=session,
+                    url=url,
+                    timeout_seconds=timeout_seconds,
+                    retries=retries,
+                    segment_sample_count=segment_sample_count,
+                    min_successful_segments=min_successful_segments,
+                    max_segment_duration=max_segment_duration,
+                    segment_probe_bytes=segment_probe_bytes,
+                )
             return index, row
 
         total = len(urls)
-        for start in range(0, total, max_workers):
-            end = min(start + max_workers, total)
-            batch_no = (start // max_workers) + 1
-            batch_total = (total + max_workers - 1) // max_workers
-            print(f"-- Batch {batch_no}/{batch_total}: items {start + 1}-{end} of {total} --")
-            batch_tasks = [
-                asyncio.create_task(run_one(index, urls[index]))
-                for index in range(start, end)
-            ]
-            try:
-                for completed in asyncio.as_completed(batch_tasks):
-                    index, row = await completed
-                    results[index] = row
-                    done += 1
-                    status = "OK" if row.ok else "FAIL"
-                    print(
-                        f"[{done}/{total}] {status} score={row.score:.1f} "
-                        f"ratio={row.throughput_ratio:.2f} {row.url} ({row.reason}) [{row.elapsed:.2f}s]"
-                    )
-            except asyncio.CancelledError:
-                for task in batch_tasks:
-                    task.cancel()
-                await asyncio.gather(*batch_tasks, return_exceptions=True)
-                raise
-            print(f"-- Batch {batch_no}/{batch_total} complete. Processed so far: {done}/{total} --")
+        # A new URL starts as soon as any slot frees, so one slow stream no longer stalls a batch.
+        tasks = [asyncio.create_task(run_one(index, url)) for index, url in enumerate(urls)]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                index, row = await completed
+                results[index] = row
+                done += 1
+                status = "OK" if row.ok else "FAIL"
+                print(
+                    f"[{done}/{total}] {status} score={row.score:.1f} "
+                    f"ratio={row.throughput_ratio:.2f} {row.url} ({row.reason}) [{row.elapsed:.2f}s]"
+                )
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
     return [row for row in results if row is not None]
 
@@ -509,24 +556,29 @@ def main() -> int:
     segment_sample_count = get_segment_sample_count()
     min_successful_segments = get_min_successful_segments()
     max_segment_duration = get_max_segment_duration()
+    per_host_limit = get_per_host_limit()
+    segment_probe_bytes = get_segment_probe_bytes()
 
     print(f"Checking {total} URL(s) from: {SOURCE_JSON_FILE}")
     print(
-        f"Workers: {max_workers}, timeout: {timeout_seconds}s, retries: {retries}, "
+        f"Workers: {max_workers} ({per_host_limit} per host), "
+        f"timeout: {timeout_seconds}s, retries: {retries}, "
         f"segment sample: {segment_sample_count}, min successful: {min_successful_segments}, "
         f"max segment duration: {max_segment_duration}s"
     )
 
     try:
-        completed_results = asyncio.run(
+        completed_results = _run(
             run_checks(
                 urls=urls,
                 timeout_seconds=timeout_seconds,
                 max_workers=max_workers,
+                per_host_limit=per_host_limit,
                 retries=retries,
                 segment_sample_count=segment_sample_count,
                 min_successful_segments=min_successful_segments,
                 max_segment_duration=max_segment_duration,
+                segment_probe_bytes=segment_probe_bytes,
             )
         )
     except KeyboardInterrupt:
@@ -12,6 +12,7 @@ FRONTEND_STREAMS_SOURCE_URL = "/DATA/connected.json"
 FRONTEND_PROMO_DISPLAY_SECONDS = 2
 FRONTEND_SNAP_SCROLL_SECONDS = 1.5
 PROXY_UPSTREAM_TIMEOUT_SECONDS = 8
+PROXY_PLAYLIST_CACHE_SECONDS = 2
 APP_SHUTDOWN_TIMEOUT_SECONDS = 2
 PROXY_CACHE_CONTROL = "no-store"
 ALLOWED_SCHEMES = ("http", "https")
@@ -29,6 +30,8 @@ GET_MD_LIST_JSON_FILE = Path("DATA/CHECK/TEMP_CHECKED.json").resolve()
 GET_MD_LIST_ACCEPT_HEADER = "application/vnd.github+json"
 GET_MD_LIST_USER_AGENT = "HTML-LiveStream-TV-Wall/1.0"
 GET_MD_LIST_TIMEOUT_SECONDS = 20
+# Optional token: authenticated api.github.com calls get 5000 requests/hour instead of 60.
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "").strip()
 
 GET_M3U8_MD_LIST_JSON = Path("DATA/CHECK/TEMP_CHECKED.json").resolve()
 GET_M3U8_JSON_FILE = Path("DATA/CHECK/TEMP_LIST.json").resolve()
@@ -36,6 +39,8 @@ GET_M3U8_USER_AGENT = "HTML-LiveStream-TV-Wall/1.0"
 GET_M3U8_TIMEOUT_SECONDS = 20
 GET_M3U8_LINK_PATTERN = r'https://[^\s)"]+?\.m3u8'
 GET_M3U8_DELAY_SECONDS = 3
+# Cached GitHub responses younger than this are reused without any request; 0 always revalidates.
+GET_M3U8_HTTP_CACHE_TTL_SECONDS = 300
 
 CHECK_M3U8_JSON_FILE = Path("DATA/CHECK/TEMP_LIST.json").resolve()
 CHECK_M3U8_OUTPUT_JSON_FILE = Path("DATA/CHECK/TEMP_CHECKED.json").resolve()
@@ -47,9 +52,11 @@ CHECK_M3U8_SOURCE_JSON_FILES = [
     "DATA/LISTS/ALL.json",
 ] + [str(path.as_posix()) for path in sorted(Path("DATA/WORLD").glob("*.json"))]
 CHECK_M3U8_MAX_WORKERS = 80
+CHECK_M3U8_PER_HOST_LIMIT = 8
 CHECK_M3U8_DELAY_SECONDS = 1
 CHECK_M3U8_TIMEOUT_SECONDS = 5
 CHECK_M3U8_TIMEOUT_RETRIES = 2
 CHECK_M3U8_SEGMENT_SAMPLE_COUNT = 3
 CHECK_M3U8_MIN_SUCCESSFUL_SEGMENTS = 2
 CHECK_M3U8_MAX_SEGMENT_DURATION = 10
+CHECK_M3U8_SEGMENT_PROBE_BYTES = 262144
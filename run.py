@@ -1,29 +1,46 @@
 import asyncio
-import json
+import os
 from pathlib import Path
 import re
+import time
 from urllib.parse import quote, urljoin, urlparse
 
 import httpx
 import uvicorn
-from fastapi import FastAPI, Query, Request
+from fastapi import BackgroundTasks, FastAPI, Query, Request
 from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, Response
 from pydantic import BaseModel
 from fastapi.staticfiles import StaticFiles
 
 import SETTINGS as settings
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(data: object) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    import json
+
+    _loads = json.loads
+
+    def _dumps(data: object) -> bytes:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
 PROJECT_ROOT = Path(__file__).resolve().parent
 FRONTEND_DIR = PROJECT_ROOT / "FRONTEND"
 DATA_DIR = PROJECT_ROOT / "DATA"
 INDEX_FILE = FRONTEND_DIR / "index.html"
 FAVICON_FILE = FRONTEND_DIR / "favicon.svg"
-ATTR_URI_RE = re.compile(r'URI="([^"]+)"')
+ATTR_URI_RE = re.compile(rb'URI="([^"]+)"')
 INDEX_STREAMS_COUNT_PLACEHOLDER = "__FRONTEND_STREAMS_COUNT__"
 INDEX_STREAMS_SOURCE_URL_PLACEHOLDER = "__FRONTEND_STREAMS_SOURCE_URL__"
 INDEX_PROMO_DISPLAY_SECONDS_PLACEHOLDER = "__FRONTEND_PROMO_DISPLAY_SECONDS__"
 INDEX_SNAP_SCROLL_SECONDS_PLACEHOLDER = "__FRONTEND_SNAP_SCROLL_SECONDS__"
 INDEX_DEV_MODE_PLACEHOLDER = "__FRONTEND_DEV_MODE__"
+PLAYLIST_CACHE_MAX_ENTRIES = 512
 
 
 def validate_settings_or_raise() -> None:
@@ -38,6 +55,7 @@ def validate_settings_or_raise() -> None:
         "FRONTEND_SNAP_SCROLL_SECONDS": (int, float),
         "APP_SHUTDOWN_TIMEOUT_SECONDS": int,
         "PROXY_UPSTREAM_TIMEOUT_SECONDS": int,
+        "PROXY_PLAYLIST_CACHE_SECONDS": (int, float),
         "PROXY_CACHE_CONTROL": str,
         "ALLOWED_SCHEMES": tuple,
         "DEFAULT_USER_AGENT": str,
@@ -107,8 +125,7 @@ class NoCacheStaticFiles(StaticFiles):
 app.mount("/DATA", NoCacheStaticFiles(directory=DATA_DIR), name="data")
 
 
-@app.get("/", include_in_schema=False)
-def serve_index() -> HTMLResponse:
+def render_index_html() -> str:
     html = INDEX_FILE.read_text(encoding="utf-8")
     html = html.replace(
         INDEX_STREAMS_COUNT_PLACEHOLDER, str(max(0, settings.FRONTEND_STREAMS_COUNT))
@@ -128,7 +145,24 @@ def serve_index() -> HTMLResponse:
         INDEX_DEV_MODE_PLACEHOLDER,
         "true" if settings.DEV_MODE else "false",
     )
-    return HTMLResponse(content=html)
+    return html
+
+
+# The placeholders only depend on SETTINGS, so the page is rendered once;
+# DEV_MODE re-renders it when index.html changes on disk.
+_INDEX_MTIME_NS = INDEX_FILE.stat().st_mtime_ns
+_INDEX_HTML = render_index_html()
+
+
+@app.get("/", include_in_schema=False)
+def serve_index() -> HTMLResponse:
+    global _INDEX_HTML, _INDEX_MTIME_NS
+    if settings.DEV_MODE:
+        mtime_ns = INDEX_FILE.stat().st_mtime_ns
+        if mtime_ns != _INDEX_MTIME_NS:
+            _INDEX_HTML = render_index_html()
+            _INDEX_MTIME_NS = mtime_ns
+    return HTMLResponse(content=_INDEX_HTML)
 
 
 ALLOWED_LISTS = {
@@ -163,59 +197,98 @@ def _resolve_source_key(source_url: str) -> str | None:
     return None
 
 
+# key -> (file mtime_ns when loaded, items); edits are made here and flushed in the background.
+_LIST_CACHE: dict[str, tuple[int | None, list[str]]] = {}
+_DIRTY_LISTS: set[str] = set()
+_LIST_LOCK = asyncio.Lock()
+
+
+def _get_list(key: str) -> list[str]:
+    """Return the cached list, reloading it if the file was changed by someone else."""
+    path = ALLOWED_LISTS[key]
+    try:
+        mtime_ns: int | None = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime_ns = None
+
+    cached = _LIST_CACHE.get(key)
+    if cached is not None and (key in _DIRTY_LISTS or cached[0] == mtime_ns):
+        return cached[1]
+
+    items: list[str] = []
+    if mtime_ns is not None:
+        try:
+            data = _loads(path.read_bytes())
+        except ValueError:
+            data = []
+        if isinstance(data, list):
+            items = data
+    _LIST_CACHE[key] = (mtime_ns, items)
+    return items
+
+
+def _set_list(key: str, items: list[str]) -> None:
+    _LIST_CACHE[key] = (None, items)
+    _DIRTY_LISTS.add(key)
+
+
+def _write_list(path: Path, payload: bytes) -> int:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(payload)
+    os.replace(tmp_path, path)
+    return path.stat().st_mtime_ns
+
+
+async def _flush_lists() -> None:
+    async with _LIST_LOCK:
+        for key in list(_DIRTY_LISTS):
+            items = _LIST_CACHE[key][1]
+            mtime_ns = await asyncio.to_thread(_write_list, ALLOWED_LISTS[key], _dumps(items))
+            _LIST_CACHE[key] = (mtime_ns, items)
+            _DIRTY_LISTS.discard(key)
+
+
 @app.post("/api/send-to-list", include_in_schema=False)
-def send_to_list(body: SendToListRequest) -> JSONResponse:
+async def send_to_list(body: SendToListRequest, background_tasks: BackgroundTasks) -> JSONResponse:
     if not settings.DEV_MODE:
         return JSONResponse({"error": "dev mode only"}, status_code=403)
 
-    target_path = ALLOWED_LISTS.get(body.target)
-    if not target_path:
+    if body.target not in ALLOWED_LISTS:
         return JSONResponse({"error": f"unknown target: {body.target}"}, status_code=400)
 
-    # Remove from source list
     source_key = _resolve_source_key(body.source)
-    if source_key and source_key != body.target:
-        source_path = ALLOWED_LISTS[source_key]
-        if source_path.exists():
-            try:
-                source_items = json.loads(source_path.read_text(encoding="utf-8"))
-            except (json.JSONDecodeError, ValueError):
-                source_items = []
+    async with _LIST_LOCK:
+        # Remove from source list
+        if source_key and source_key != body.target:
+            source_items = _get_list(source_key)
             if body.url in source_items:
                 source_items.remove(body.url)
-                source_path.write_text(
-                    json.dumps(source_items, indent=2, ensure_ascii=False), encoding="utf-8"
-                )
+                _set_list(source_key, source_items)
 
-    # Add to target list
-    items: list[str] = []
-    if target_path.exists():
-        try:
-            items = json.loads(target_path.read_text(encoding="utf-8"))
-        except (json.JSONDecodeError, ValueError):
-            items = []
-
-    if body.url in items:
-        items.remove(body.url)
-
-    items.insert(0, body.url)
-    target_path.write_text(json.dumps(items, indent=2, ensure_ascii=False), encoding="utf-8")
+        # Add to target list
+        items = _get_list(body.target)
+        if body.url in items:
+            items.remove(body.url)
+        items.insert(0, body.url)
+        _set_list(body.target, items)
 
+    background_tasks.add_task(_flush_lists)
     return JSONResponse({"ok": True, "target": body.target, "source": source_key or ""})
 
 
 @app.post("/api/reorder-list", include_in_schema=False)
-def reorder_list(body: ReorderListRequest) -> JSONResponse:
+async def reorder_list(body: ReorderListRequest, background_tasks: BackgroundTasks) -> JSONResponse:
     if not settings.DEV_MODE:
         return JSONResponse({"error": "dev mode only"}, status_code=403)
     source_key = _resolve_source_key(body.source)
     if not source_key:
         return JSONResponse({"error": "unknown source"}, status_code=400)
-    path = ALLOWED_LISTS[source_key]
     for url in body.urls:
         if not isinstance(url, str) or not url.startswith("http"):
             return JSONResponse({"error": "invalid url"}, status_code=400)
-    path.write_text(json.dumps(body.urls, indent=2, ensure_ascii=False), encoding="utf-8")
+    async with _LIST_LOCK:
+        _set_list(source_key, list(body.urls))
+    background_tasks.add_task(_flush_lists)
     return JSONResponse({"ok": True, "source": source_key, "count": len(body.urls)})
 
 
@@ -233,34 +306,70 @@ def build_proxy_url(target_url: str) -> str:
     return f"/proxy?url={quote(target_url, safe='')}"
 
 
-def rewrite_attr_uri(line: str, base_url: str) -> str:
-    def repl(match: re.Match[str]) -> str:
-        raw = match.group(1)
-        absolute = urljoin(base_url, raw)
-        return f'URI="{build_proxy_url(absolute)}"'
+def proxy_uri_bytes(raw: bytes, base_url: str) -> bytes:
+    absolute = urljoin(base_url, raw.decode("utf-8", errors="replace"))
+    # quote(safe="") leaves only ASCII in the proxy URL.
+    return build_proxy_url(absolute).encode("ascii")
+
+
+def rewrite_attr_uri(line: bytes, base_url: str) -> bytes:
+    def repl(match: re.Match[bytes]) -> bytes:
+        return b'URI="' + proxy_uri_bytes(match.group(1), base_url) + b'"'
 
     return ATTR_URI_RE.sub(repl, line)
 
 
-def rewrite_m3u8(m3u8_text: str, base_url: str) -> str:
-    out_lines: list[str] = []
-    for line in m3u8_text.splitlines():
+def rewrite_m3u8(body: bytes, base_url: str) -> bytes:
+    # Works on the raw body: only URIs are decoded, everything else is copied through as bytes.
+    out = bytearray()
+    for line in body.splitlines():
         stripped = line.strip()
         if not stripped:
-            out_lines.append(line)
-            continue
+            out += line
+        elif stripped.startswith(b"#"):
+            out += rewrite_attr_uri(line, base_url) if b"URI=" in line else line
+        else:
+            out += proxy_uri_bytes(stripped, base_url)
+        out += b"\n"
 
-        if stripped.startswith("#"):
-            if "URI=" in line:
-                out_lines.append(rewrite_attr_uri(line, base_url))
-            else:
-                out_lines.append(line)
-            continue
+    del out[-1:]
+    return bytes(out)
 
-        absolute = urljoin(base_url, stripped)
-        out_lines.append(build_proxy_url(absolute))
 
-    return "\n".join(out_lines)
+# (url, user-agent) -> (expires_at, rewritten playlist, status code)
+_PLAYLIST_CACHE: dict[tuple[str, str], tuple[float, bytes, int]] = {}
+_PLAYLIST_LOCKS: dict[tuple[str, str], asyncio.Lock] = {}
+_PLAYLIST_LOCK_USERS: dict[tuple[str, str], int] = {}
+
+
+def _playlist_response(body: bytes, status_code: int) -> Response:
+    return Response(
+        content=body,
+        media_type="application/vnd.apple.mpegurl",
+        status_code=status_code,
+        headers={"Cache-Control": settings.PROXY_CACHE_CONTROL},
+    )
+
+
+def _get_cached_playlist(key: tuple[str, str]) -> Response | None:
+    entry = _PLAYLIST_CACHE.get(key)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    return _playlist_response(entry[1], entry[2])
+
+
+def _store_cached_playlist(key: tuple[str, str], response: Response) -> None:
+    if response.status_code >= 400 or response.media_type != "application/vnd.apple.mpegurl":
+        return
+    now = time.monotonic()
+    if len(_PLAYLIST_CACHE) >= PLAYLIST_CACHE_MAX_ENTRIES:
+        for stale_key in [k for k, v in _PLAYLIST_CACHE.items() if v[0] <= now]:
+            del _PLAYLIST_CACHE[stale_key]
+    _PLAYLIST_CACHE[key] = (
+        now + settings.PROXY_PLAYLIST_CACHE_SECONDS,
+        response.body,
+        response.status_code,
+    )
 
 
 @app.get("/proxy", include_in_schema=False)
@@ -277,6 +386,38 @@ async def proxy_hls(request: Request, url: str = Query(...)) -> Response:
     if range_header:
         headers["Range"] = range_header
 
+    # Every tile showing a channel polls the same playlist; serve repeats from a short TTL cache
+    # and let only one request per key go upstream at a time.
+    if (
+        range_header
+        or settings.PROXY_PLAYLIST_CACHE_SECONDS <= 0
+        or ".m3u8" not in parsed.path.lower()
+    ):
+        return await fetch_upstream(url, headers)
+
+    key = (url, headers["User-Agent"])
+    cached = _get_cached_playlist(key)
+    if cached is not None:
+        return cached
+    lock = _PLAYLIST_LOCKS.setdefault(key, asyncio.Lock())
+    _PLAYLIST_LOCK_USERS[key] = _PLAYLIST_LOCK_USERS.get(key, 0) + 1
+    try:
+        async with lock:
+            cached = _get_cached_playlist(key)
+            if cached is not None:
+                return cached
+            response = await fetch_upstream(url, headers)
+            _store_cached_playlist(key, response)
+            return response
+    finally:
+        # Drop the lock with its last user so uncached keys do not pile up.
+        _PLAYLIST_LOCK_USERS[key] -= 1
+        if not _PLAYLIST_LOCK_USERS[key]:
+            del _PLAYLIST_LOCK_USERS[key]
+            del _PLAYLIST_LOCKS[key]
+
+
+async def fetch_upstream(url: str, headers: dict[str, str]) -> Response:
     try:
         timeout = httpx.Timeout(settings.PROXY_UPSTREAM_TIMEOUT_SECONDS)
         async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
@@ -294,14 +435,7 @@ async def proxy_hls(request: Request, url: str = Query(...)) -> Response:
         )
 
         if is_m3u8:
-            text = body.decode("utf-8", errors="replace")
-            rewritten = rewrite_m3u8(text, final_url)
-            return Response(
-                content=rewritten.encode("utf-8"),
-                media_type="application/vnd.apple.mpegurl",
-                status_code=status_code,
-                headers={"Cache-Control": settings.PROXY_CACHE_CONTROL},
-            )
+            return _playlist_response(rewrite_m3u8(body, final_url), status_code)
 
         pass_headers = {}
         for key in ("Content-Range", "Accept-Ranges", "Content-Length"):